@@ -3,7 +3,8 @@
 
 """
 
-import logging, inspect
+import logging
+from types import FunctionType
 logger = logging.getLogger('argparse.arguments')
 
 from argparse import Action
@@ -40,7 +41,8 @@ class arg(object):
         self.args = args
         self.opts = opts
 
-    def apply(self, parser, command, context=''):
+    def register(self, command, context=''):
+        '''register config name of this argument at command'''
         if hasattr(self, 'config_name'):
             config_name = self.config_name
         else:
@@ -52,8 +54,14 @@ class arg(object):
         if 'dest' not in self.opts and not self.args[0][0].isalnum():
             self.opts['dest'] = self.dest
 
+    def add_to(self, parser):
+        '''add this argument to parser (or argument group), return action'''
         logger.debug("apply: %s", self)
-        parser.add_argument(*self.args, **self.opts)
+        return parser.add_argument(*self.args, **self.opts)
+
+    def apply(self, parser, command, context=''):
+        self.register(command, context)
+        return self.add_to(parser)
 
     def __getattr__(self, name):
         if name == 'dest':
@@ -101,7 +109,7 @@ class arg(object):
 
     def __call__(self, *args, **kwargs):
         # factory for other arg
-        if not (len(args) == 1 and inspect.isfunction(args[0])):
+        if not (len(args) == 1 and type(args[0]) is FunctionType):
             _args = self.args
             if len(args):
                 _args = args
@@ -125,11 +133,10 @@ class arg(object):
 class opt(arg):
     """Option action="store_true" """
 
-    def apply(self, parser, command, context=''):
-        logger.debug("apply: %s", self)
+    def register(self, command, context=''):
         self.opts['action'] = 'store_true'
         self.opts['default'] = False
-        arg.apply(self, parser, command, context)
+        arg.register(self, command, context)
 
 
 class group(arg):
@@ -154,14 +161,23 @@ class group(arg):
             pass
     """
 
-    def apply(self, parser, command, context='', method='add_argument_group'):
-        more_args = self.opts.pop('args', [])
-        group = getattr(parser, method)(**self.opts)
+    def members(self):
+        '''return arguments of this group'''
+        return list(self.args) + list(self.opts.get('args', []))
 
-        for a in self.args:
-            a.apply(group, command)
-        for a in more_args:
-            a.apply(group, command)
+    def register(self, command, context=''):
+        for a in self.members():
+            a.register(command)
+
+    def add_to(self, parser, method='add_argument_group'):
+        opts = dict(self.opts)
+        opts.pop('args', None)
+        group = getattr(parser, method)(**opts)
+
+        for a in self.members():
+            a.add_to(group)
+
+        return group
 
 
 class mutually_exclusive(group):
@@ -184,5 +200,5 @@ class mutually_exclusive(group):
 
     """
 
-    def apply(self, parser, command, context=''):
-        group.apply(self, parser, command, context, 'add_mutually_exclusive_group')
+    def add_to(self, parser):
+        return group.add_to(self, parser, 'add_mutually_exclusive_group')
@@ -4,7 +4,6 @@ from .arguments import arg
 import os
 
 import logging, sys, argparse
-logging.basicConfig()
 
 logger = logging.getLogger('argdeco.command_decorator')
 #logger.setLevel(logging.DEBUG)
@@ -20,6 +19,203 @@ class Undefined:
 class NoAction(RuntimeError):
     pass
 
+def _leaf_args(a):
+    '''yield plain arguments of a, i.e. a itself or the members of a group'''
+    members = getattr(a, 'members', None)
+    if members is None:
+        yield a
+    else:
+        for m in members():
+            for leaf in _leaf_args(m):
+                yield leaf
+
+
+_formatters = {}
+
+def _formatter(formatter_class):
+    '''return a cached formatter of formatter_class, for checking arguments'''
+    if formatter_class not in _formatters:
+        _formatters[formatter_class] = formatter_class(prog='')
+    return _formatters[formatter_class]
+
+
+class LazyArgumentParser(ArgumentParser):
+    '''ArgumentParser used for (sub)command parsers
+
+    Arguments of a command are recorded with :py:meth:`defer_argument` and
+    only added, when the parser is actually used, i.e. if its command is
+    selected on command line or its help is formatted.  This way a CLI with
+    many commands only builds the arguments of the commands invoked.
+
+    Any other use of the parser (add_argument(), set_defaults(), ...) adds
+    the recorded arguments first, so it behaves like a regular
+    ArgumentParser.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self._pending_arguments = []
+        self._pending_option_strings = set()
+        ArgumentParser.__init__(self, *args, **kwargs)
+
+    def defer_argument(self, a):
+        '''record argument a (an :py:class:`~argdeco.arguments.arg`) to be
+        added on first use of parser
+
+        a is checked like argparse would do on adding it.  If argparse would
+        reject a (e.g. conflicting option strings, unknown action, bad nargs),
+        it is added right away, such that the error is raised on definition.
+        '''
+        option_strings = self._check_deferrable(a)
+        if option_strings is None:
+            self.materialize()
+            a.add_to(self)
+        else:
+            self._pending_arguments.append(a)
+            self._pending_option_strings.update(option_strings)
+
+    # _check_deferrable() and _check_argument() replay the checks of
+    # argparse's add_argument() and use private argparse API for this
+    # (_registry_get, _pop_action_class, _get_positional_kwargs,
+    # _get_optional_kwargs, _option_string_actions, _format_args) as well
+    # as the overridden _get_*_actions() and _add_container_actions() below.
+    # Checked against argparse of python 3.6 to 3.13.
+
+    def _check_deferrable(self, a):
+        # return option strings of a, or None if a must be added right away
+        chars = self.prefix_chars
+        option_strings = set()
+        for leaf in _leaf_args(a):
+            try:
+                self._check_argument(leaf.args, leaf.opts)
+            except Exception:
+                # let argparse raise its own error
+                return None
+
+            args = leaf.args
+            if args and (len(args) > 1 or args[0][:1] in chars):
+                for s in args:
+                    if (s in option_strings
+                            or s in self._option_string_actions
+                            or s in self._pending_option_strings):
+                        return None
+                    option_strings.add(s)
+
+        return option_strings
+
+    def _check_argument(self, args, kwargs):
+        # like add_argument(), but the action is discarded instead of added
+        chars = self.prefix_chars
+        if not args or len(args) == 1 and args[0][0] not in chars:
+            if args and 'dest' in kwargs:
+                raise ValueError('dest supplied twice for positional argument')
+            kwargs = self._get_positional_kwargs(*args, **kwargs)
+        else:
+            kwargs = self._get_optional_kwargs(*args, **kwargs)
+
+        if 'default' not in kwargs:
+            dest = kwargs['dest']
+            if dest in self._defaults:
+                kwargs['default'] = self._defaults[dest]
+            elif self.argument_default is not None:
+                kwargs['default'] = self.argument_default
+
+        action_class = self._pop_action_class(kwargs)
+        if not callable(action_class):
+            raise ValueError('unknown action "%s"' % (action_class,))
+        action = action_class(**kwargs)
+
+        type_func = self._registry_get('type', action.type, action.type)
+        if not callable(type_func):
+            raise ValueError('%r is not callable' % (type_func,))
+        if type_func is argparse.FileType:
+            raise ValueError('%r is a FileType class object' % (type_func,))
+
+        # raises TypeError on a metavar tuple not matching nargs
+        _formatter(self.formatter_class)._format_args(action, None)
+
+    def materialize(self):
+        '''add all recorded arguments'''
+        pending = self._pending_arguments
+        if pending:
+            self._pending_arguments = []
+            self._pending_option_strings = set()
+            for i, a in enumerate(pending):
+                try:
+                    a.add_to(self)
+                except:
+                    # keep a and the arguments after it recorded
+                    self._pending_arguments = pending[i:]
+                    self._pending_option_strings = set(
+                        s for b in pending[i:] for leaf in _leaf_args(b)
+                          for s in leaf.args if s[:1] in self.prefix_chars)
+                    raise
+
+    def add_argument(self, *args, **kwargs):
+        self.materialize()
+        return ArgumentParser.add_argument(self, *args, **kwargs)
+
+    def set_defaults(self, **kwargs):
+        # only recorded arguments with a new default must be added first
+        if any(leaf.dest in kwargs
+               for a in self._pending_arguments for leaf in _leaf_args(a)):
+            self.materialize()
+        return ArgumentParser.set_defaults(self, **kwargs)
+
+    def get_default(self, dest):
+        self.materialize()
+        return ArgumentParser.get_default(self, dest)
+
+    def parse_known_args(self, *args, **kwargs):
+        self.materialize()
+        return ArgumentParser.parse_known_args(self, *args, **kwargs)
+
+    def format_usage(self):
+        self.materialize()
+        return ArgumentParser.format_usage(self)
+
+    def format_help(self):
+        self.materialize()
+        return ArgumentParser.format_help(self)
+
+    def _get_optional_actions(self):
+        self.materialize()
+        return ArgumentParser._get_optional_actions(self)
+
+    def _get_positional_actions(self):
+        self.materialize()
+        return ArgumentParser._get_positional_actions(self)
+
+    # keep order of arguments for following methods
+
+    def add_subparsers(self, **kwargs):
+        self.materialize()
+        return ArgumentParser.add_subparsers(self, **kwargs)
+
+    def add_argument_group(self, *args, **kwargs):
+        self.materialize()
+        return ArgumentParser.add_argument_group(self, *args, **kwargs)
+
+    def add_mutually_exclusive_group(self, **kwargs):
+        self.materialize()
+        return ArgumentParser.add_mutually_exclusive_group(self, **kwargs)
+
+    def _add_container_actions(self, container):
+        if isinstance(container, LazyArgumentParser):
+            container.materialize()
+        return ArgumentParser._add_container_actions(self, container)
+
+
+def materialize_all(parser):
+    '''materialize parser and all its (lazy) subparsers recursively'''
+    if isinstance(parser, LazyArgumentParser):
+        parser.materialize()
+
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            for subparser in action.choices.values():
+                materialize_all(subparser)
+
+
 class CommandDecorator:
     """
     Create a decorator to decorate functions with their arguments.
@@ -124,6 +320,9 @@ class CommandDecorator:
             setattr(self, k, kwargs.pop(k, None))
 
         self.config_map = {}
+        # flat (context, dest) -> config_name index of config_map
+        self._config_index = {}
+        self._config_name_cache = {}
         self.compile = None
 
         if 'argparser' in kwargs:
@@ -146,7 +345,7 @@ class CommandDecorator:
 
     def add_parser(self, command, *args, **kwargs):
         if self.commands is None:
-            self.commands = self.argparser.add_subparsers()
+            self.commands = self.argparser.add_subparsers(parser_class=LazyArgumentParser)
 
         parser_action = self.commands.add_parser(command, *args, **kwargs)
         #parser_action.set_default(action=lambda *a, **k: self.argparser.print_help(None))
@@ -242,6 +441,18 @@ class CommandDecorator:
         for k,v in kwargs.items():
             setattr(argparser, k, v)
 
+    def has_argument(self, a):
+        '''return True, if argument a (an :py:class:`~argdeco.arguments.arg`)
+        or one of its option strings is already added to argparser'''
+        if isinstance(self.argparser, LazyArgumentParser):
+            self.argparser.materialize()
+
+        if not a.args[0][0].isalnum():
+            option_strings = self.argparser._option_string_actions
+            return any(s in option_strings for s in a.args)
+
+        return any(action.dest == a.dest for action in self.argparser._actions)
+
     def add_argument(self, *args, **kwargs):
         logger.debug("add_argument: %s, %s", args, kwargs)
         if len(args) == 1 and isinstance(args[0], arg):
@@ -261,6 +472,8 @@ class CommandDecorator:
             _root.config_map[context] = {}
 
         _root.config_map[context][dest] = config_name
+        _root._config_index[(context, dest)] = config_name
+        _root._config_name_cache.clear()
 
     #     map_name = self.get_name()
     #     logger.debug("map_name=%s", map_name)
@@ -292,7 +505,12 @@ class CommandDecorator:
             elif not isinstance(a, arg):
                 raise ValueError("cannot convert %s into arg type" % a)
 
-            a.apply(argparser, self, context=context)
+            if isinstance(argparser, LazyArgumentParser):
+                # add argument to parser on first use of the (sub)command
+                a.register(self, context)
+                argparser.defer_argument(a)
+            else:
+                a.apply(argparser, self, context=context)
 
 
     def get_config_name(self, action, name=None):
@@ -305,6 +523,11 @@ class CommandDecorator:
         "index.ls.all" as configuration name for this option.
         '''
 
+        key = (action, name)
+        config_name = self._config_name_cache.get(key, Undefined)
+        if config_name is not Undefined:
+            return config_name
+
         _name = None
 
         if name is None:
@@ -321,17 +544,17 @@ class CommandDecorator:
 
         logger.debug("_name=%s", _name)
 
+        config_index = self._config_index
         config_name = Undefined
         while True:
             logger.debug("check _name=%s, name=%s", repr(_name), repr(name))
 
-            if _name in self.config_map:
-                if name in self.config_map[_name]:
-                    config_name = self.config_map[_name][name]
-                    if config_name is not None:
-                        if config_name.startswith('.'):
-                            config_name = _name + config_name
-                    break
+            config_name = config_index.get((_name, name), Undefined)
+            if config_name is not Undefined:
+                if config_name is not None:
+                    if config_name.startswith('.'):
+                        config_name = _name + config_name
+                break
 
             if _name == '':
                 break
@@ -345,6 +568,7 @@ class CommandDecorator:
         assert config_name is not Undefined, "could not determine config name for %s" % name
 #        if config_name.startswith('.'):
 #            config_name = config_name[1:]
+        self._config_name_cache[key] = config_name
         return config_name
 
 
@@ -406,10 +630,9 @@ class CommandDecorator:
                 'help': help,
                 'formatter_class': self.formatter_class,
                 self.doc: desc,
+                **opts
             }
 
-            kwargs.update(opts)
-
             if len(_args) and isinstance(_args[0], basestring):
                 name = _args[0]
                 _args = _args[1:]
@@ -420,7 +643,14 @@ class CommandDecorator:
                 command = self.argparser
 
             func.argdeco_name = context = self.get_name(name)
-            self.config_map[func.argdeco_name] = {}
+            _root = self
+            while _root.parent is not None:
+                _root = _root.parent
+            # forget config names registered before for this context
+            for dest in _root.config_map.get(context, ()):
+                _root._config_index.pop((context, dest), None)
+            _root.config_map[context] = self.config_map[context] = {}
+            self._config_name_cache.clear()
 
             self.add_arguments(*_args, argparser=command, context=context)
 
@@ -441,6 +671,9 @@ class CommandDecorator:
             argv = sys.argv[1:]
 
         import argcomplete
+        if '_ARGCOMPLETE' in os.environ:
+            # argcomplete inspects actions of parsers before parsing
+            materialize_all(self.argparser)
         argcomplete.autocomplete(self.argparser)
         args = self.argparser.parse_args(argv)
 
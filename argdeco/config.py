@@ -36,10 +36,131 @@ following::
 
 """
 
-import logging
+import logging, json, os, sys, tempfile
 log = logging.getLogger('argdeco.config')
 log.setLevel(logging.NOTSET)
 
+_yaml = None
+
+def _get_yaml():
+    '''import yaml on first use and return it together with the Loader
+
+    Uses LibYAML's C loader, if available, else the pure python one.
+    '''
+    global _yaml
+    if _yaml is None:
+        import yaml
+        _yaml = (yaml, getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    return _yaml
+
+
+def load_yaml(stream):
+    '''load YAML data from stream'''
+    yaml, Loader = _get_yaml()
+    return yaml.load(stream, Loader=Loader)
+
+
+def _write_cache(cache, content, mode):
+    '''write content to file cache, which gets permissions mode
+
+    The cache may contain secrets from its source, so it gets the same
+    permissions.  It is written to a unique temporary file first, which
+    replaces cache, so parallel runs do not see partial files.
+    '''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache) or '.',
+        prefix=os.path.basename(cache) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            os.chmod(tmp, mode)
+            f.write(content)
+        os.replace(tmp, cache)
+    except:
+        os.unlink(tmp)
+        raise
+
+
+def load_yaml_file(fn):
+    '''load YAML data from file fn
+
+    Parsed data is cached as JSON in ``fn + '.cache.json'`` together with
+    modification time (in ns) and size of fn and reused as long as both
+    match exactly.  If the cache cannot be read or written (e.g. read-only
+    config directory), fn is parsed directly.
+    '''
+    cache = fn + '.cache.json'
+    st = os.stat(fn)
+    source = [st.st_mtime_ns, st.st_size]
+    try:
+        with open(cache, 'r') as f:
+            cached = json.load(f)
+        if cached['source'] == source:
+            return cached['data']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    # read at once, LibYAML's parser does not need to pull chunks from file
+    with open(fn, 'rb') as f:
+        data = load_yaml(f.read())
+
+    try:
+        dumped = json.dumps({'source': source, 'data': data})
+        # only cache data, which survives a JSON round trip (no dates etc.)
+        if json.loads(dumped)['data'] == data:
+            _write_cache(cache, dumped, st.st_mode & 0o777)
+    except (OSError, TypeError, ValueError):
+        log.debug("could not write config cache %s", cache, exc_info=1)
+
+    return data
+
+
+_PATH_CACHE = {}
+
+# attributes controlled by dict class, and per class cache of other ones
+_DICT_ATTRS = frozenset(dir(dict))
+_EXTRA_ATTRS_CACHE = {}
+
+def _split_path(name):
+    '''split dotted name into a tuple of (interned) path segments and
+    memoize it in _PATH_CACHE.  Look up _PATH_CACHE first, to avoid the call
+    on a hit.
+    '''
+    if len(_PATH_CACHE) >= 1024:
+        _PATH_CACHE.clear()
+    key_parts = _PATH_CACHE[name] = tuple(sys.intern(k) for k in name.split('.'))
+    return key_parts
+
+
+def _update(self, D):
+    '''merge dictionary D into ConfigDict self, see ConfigDict.update()
+
+    Nested dictionaries are merged without recursion, keeping the order of
+    items.
+    '''
+    stack = [(self, iter(D.items()))]
+    while stack:
+        dest, items = stack[-1]
+        for k,v in items:
+            current = dict.get(dest, k)
+            if isinstance(current, ConfigDict):
+                if isinstance(v, dict):
+                    # descend, continue with remaining items afterwards
+                    stack.append((current, iter(v.items())))
+                    break
+                current.update(v)
+            elif type(v) is dict:
+                # plain dicts have no attributes to assimilate, fill a new
+                # child instead
+                dest[k] = child = dest.__class__()
+                stack.append((child, iter(v.items())))
+                break
+            elif isinstance(v, dict) and not isinstance(v, dest.__class__):
+                dest[k] = dest.assimilate(v)
+            else:
+                dest[k] = v
+        else:
+            stack.pop()
+
+
 class ConfigDict(dict):
     '''dictionary-like class
 
@@ -56,11 +177,22 @@ class ConfigDict(dict):
     '''
 
     def __init__(self, E=None, **F):
-        super(ConfigDict, self).__init__()
-        self.update(E, **F)
+        dict.__init__(self)
+        if E is not None or F:
+            self.update(E, **F)
 
     def __getitem__(self, name):
-        key_parts = name.split('.')
+        if '.' not in name:
+            return dict.__getitem__(self, name)
+
+        head, _, tail = name.partition('.')
+        if '.' not in tail:
+            value = dict.__getitem__(self, head)
+            if isinstance(value, dict):
+                return value[tail]
+            raise KeyError(name)
+
+        key_parts = _PATH_CACHE.get(name) or _split_path(name)
         value = super(ConfigDict, self).__getitem__(key_parts[0])
         for k in key_parts[1:]:
             if isinstance(value, dict):
@@ -71,20 +203,20 @@ class ConfigDict(dict):
         return value
 
     def __setitem__(self, name, value):
-        key_parts = name.split('.')
-        if len(key_parts) == 1:
-            super(ConfigDict, self).__setitem__(key_parts[0], value)
+        if '.' not in name:
+            dict.__setitem__(self, name, value)
         else:
-            try:
-                val = super(ConfigDict, self).__getitem__(key_parts[0])
-            except KeyError:
-                super(ConfigDict, self).__setitem__(key_parts[0], self.__class__())
-                val = super(ConfigDict, self).__getitem__(key_parts[0])
+            key_parts = _PATH_CACHE.get(name) or _split_path(name)
+            val = dict.get(self, key_parts[0])
+            if val is None:
+                val = self.__class__()
+                dict.__setitem__(self, key_parts[0], val)
 
             for k in key_parts[1:-1]:
-                if k not in val:
-                    val[k] = self.__class__()
-                val = val[k]
+                _val = val.get(k)
+                if _val is None:
+                    _val = val[k] = self.__class__()
+                val = _val
 
             if isinstance(value, dict) and not isinstance(value, self.__class__):
                 val[key_parts[-1]] = self.assimilate(value)
@@ -105,19 +237,44 @@ class ConfigDict(dict):
         result = self.__class__()
         result.update(value)
 
-        for a in dir(value):
-            if not hasattr({}, a):
-                #log.debug("assimilate, %s => %s", a, getattr(value, a))
-                setattr(result, a, getattr(value, a))
+        cls = type(value)
+        if cls is dict:
+            # plain dicts have no attributes to copy
+            return result
+
+        extras = _EXTRA_ATTRS_CACHE.get(cls)
+        if extras is None:
+            extras = _EXTRA_ATTRS_CACHE[cls] = tuple(
+                a for a in dir(cls) if a not in _DICT_ATTRS)
+
+        # instance attributes are not known from class
+        instance_attrs = getattr(value, '__dict__', None)
+        if instance_attrs:
+            extras = sorted(set(extras).union(
+                a for a in instance_attrs if a not in _DICT_ATTRS))
+
+        for a in extras:
+            #log.debug("assimilate, %s => %s", a, getattr(value, a))
+            setattr(result, a, getattr(value, a))
 
         return result
 
     def __contains__(self, name):
-        try:
-            self[name]
-            return True
-        except KeyError:
-            return False
+        if '.' not in name:
+            return dict.__contains__(self, name)
+
+        head, _, tail = name.partition('.')
+        if '.' not in tail:
+            value = dict.get(self, head)
+            return isinstance(value, dict) and tail in value
+
+        value = self
+        for k in _PATH_CACHE.get(name) or _split_path(name):
+            if not isinstance(value, dict) or k not in value:
+                return False
+            value = value[k]
+
+        return True
 
 
     def flatten(self, D):
@@ -130,12 +287,18 @@ class ConfigDict(dict):
             return D
 
         result = {}
-        for k,v in D.items():
-            if isinstance(v, dict):
-                for _k,_v in self.flatten(v).items():
-                    result['.'.join([k,_k])] = _v
+        stack = [('', iter(D.items()))]
+        while stack:
+            prefix, items = stack[-1]
+            for k,v in items:
+                if isinstance(v, dict):
+                    # descend, continue with remaining items afterwards
+                    stack.append((prefix + k + '.', iter(v.items())))
+                    break
+                result[prefix + k] = v
             else:
-                result[k] = v
+                stack.pop()
+
         return result
 
 
@@ -151,27 +314,30 @@ class ConfigDict(dict):
         {'foo: {'blub': 'bla'}'}
 
         '''
-        def _update(D):
-            for k,v in D.items():
-                if super(ConfigDict, self).__contains__(k):
-                    if isinstance(self[k], ConfigDict):
-                        self[k].update(v)
-                    else:
-                        self[k] = self.assimilate(v)
-                else:
-                    self[k] = self.assimilate(v)
-
         if E is not None:
             if not hasattr(E, 'keys'):
                 E = self.assimilate(dict(E))
-            _update(E)
 
-        _update(F)
+            _update(self, E)
+
+        _update(self, F)
 
         return self
 
 
 
+_CONFIG_METHODS = ('init_args', 'load', 'load_from_file', 'update', 'compile_args')
+_config_methods_cache = {}
+
+def _config_methods(cls):
+    '''return set of optional config methods implemented by class cls'''
+    methods = _config_methods_cache.get(cls)
+    if methods is None:
+        methods = _config_methods_cache[cls] = frozenset(
+            m for m in _CONFIG_METHODS if hasattr(cls, m))
+    return methods
+
+
 def config_factory(ConfigClass=dict, prefix=None,
     config_file=None
     ):
@@ -240,53 +406,53 @@ def config_factory(ConfigClass=dict, prefix=None,
             if config_file:
                 from .arguments import arg
                 assert isinstance(config_file, arg), "config_file must be of type arg"
-                try:
+                if not self.command.has_argument(config_file):
                     self.command.add_argument(config_file)
-                except:
-                    pass
 
         def __call__(self, args, **opts):
             cfg = ConfigClass()
+            methods = _config_methods(type(cfg))
 
-            if hasattr(cfg, 'init_args'):
+            if 'init_args' in methods:
                 cfg.init_args(args)
 
             if config_file is not None:
-                if hasattr(args, config_file.dest):
-                    fn = getattr(args, config_file.dest)
-                    if fn is not None:
-                        if hasattr(cfg, 'load'):
-                            if config_file.dest == '-':
-                                cfg.load(sys.stdin)
-                            else:
-                                with open(fn, 'r') as f:
-                                    cfg.load(f)
-
-                        elif hasattr(cfg, 'load_from_file'):
-                            cfg.load_from_file(fn)
-
-                        elif hasattr(cfg, 'update'):
-                            # assume yaml file
-                            import yaml
+                fn = getattr(args, config_file.dest, None)
+                if fn is not None:
+                    if 'load' in methods:
+                        if fn == '-':
+                            cfg.load(sys.stdin)
+                        else:
                             with open(fn, 'r') as f:
-                                data = yaml.load(f)
-                            cfg.update(data)
+                                cfg.load(f)
+
+                    elif 'load_from_file' in methods:
+                        cfg.load_from_file(fn)
+
+                    elif 'update' in methods:
+                        # assume yaml file
+                        cfg.update(load_yaml_file(fn))
+
+            action = args.action
+            get_config_name = self.command.get_config_name
+            _prefix = prefix + '.' if prefix is not None else ''
 
             for k,v in opts.items():
-                config_name = self.command.get_config_name(args.action, k)
+                if v is None: continue
+
+                config_name = get_config_name(action, k)
 
                 if config_name is None: continue
 
-                if config_name.startswith('.'):
+                if config_name[:1] == '.':
                     config_name = config_name[1:]
 
-                if prefix is not None:
-                    config_name = '.'.join([prefix, config_name])
+                if _prefix:
+                    config_name = _prefix + config_name
                 log.debug("config_name: %s", config_name)
-                if v is not None:
-                    cfg[config_name] = v
+                cfg[config_name] = v
 
-            if hasattr(cfg, 'compile_args'):
+            if 'compile_args' in methods:
                 return cfg.compile_args()
             else:
                 return (cfg,)
@@ -42,23 +42,36 @@ If you want to make use of the predefined (global) args::
 """
 
 import argdeco.command_decorator as command_decorator
-import sys, logging
-from inspect import isfunction
-import argparse
+import sys, logging, re, traceback
+from types import FunctionType
 
-import os
+import io, os
 from os.path import expanduser
 
 from .arguments import arg
 from .command_decorator import NoAction
 
-PY3 = sys.version_info > (3, 0)
-try:
-    an_exception = StandardError
-except:
-    an_exception = Exception
+# managed args and exception handling work on root logger
+_ROOT_LOGGER = logging.getLogger()
+log = logging.getLogger('argdeco.main')
 
-class ArgParseExit(an_exception):
+# marks the line activating bash completion, see install_bash_completion()
+_ARGCOMPLETE_PREFIX = b'register-python-argcomplete '
+_COMMENT_RE = re.compile(rb'\s*#')
+
+_home_fixed = False
+
+def _ensure_home():
+    '''make expanduser() work on windows, where HOME may not be set'''
+    global _home_fixed
+    if _home_fixed:
+        return
+    if 'USERPROFILE' in os.environ and 'HOME' not in os.environ:
+        os.environ['HOME'] = os.environ['USERPROFILE']
+    _home_fixed = True
+
+
+class ArgParseExit(Exception):
     def __init__(self, error_code, message):
         self.error_code=error_code
         self.message = message
@@ -70,6 +83,29 @@ class ArgParseExit(an_exception):
             return ''
 
 
+def _exit(result=0, message=None):
+    '''exit function of argparser: raise ArgParseExit to be handled by Main'''
+    raise ArgParseExit(result, message)
+
+
+# managed arguments, see Main.init_managed_args()
+
+@arg('--debug', help="print debug output", metavar='', nargs=0)
+def debug_arg(self, parser, namespace, values, option_string=None):
+    parser._argdeco_main.debug = True
+    _ROOT_LOGGER.setLevel(logging.DEBUG)
+
+verbosity_arg = arg('-v', '--verbosity', help="verbosity: set loglevel -v warning, -vv info, -vvv debug", action='count', default=0)
+
+# log levels for verbosity counted by verbosity_arg, see Main.store_args()
+_VERBOSITY_LEVELS = (logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG)
+
+@arg('--quiet', help="have no output", metavar='', nargs=0)
+def quiet_arg(self, parser, namespace, values, option_string=None):
+    _ROOT_LOGGER.setLevel(logging.CRITICAL)
+    parser._argdeco_main.quiet = True
+
+
 class Main:
     """Main function provider
 
@@ -155,6 +191,12 @@ class Main:
             print("debug is on")
     """
 
+    # names of managed arguments, which can be turned on by keyword args
+    _MANAGED_ARGS = frozenset(('debug', 'verbosity', 'quiet'))
+
+    # logging.basicConfig() is called only once per process
+    _logging_configured = False
+
     def __init__(self,
         debug         = False,
         verbosity     = False,
@@ -169,10 +211,9 @@ class Main:
         **kwargs
         ):
 
-        # initialize logging
-        logging.basicConfig(format=log_format)
-        logger = logging.getLogger()
-        logger.setLevel(logging.ERROR)
+        # logging is initialized on first run, see _ensure_logging()
+        self.log_format = log_format
+        self._logger = _ROOT_LOGGER
 
         # initialize error_handler and error_code
         self.error_handler = error_handler
@@ -183,6 +224,9 @@ class Main:
         self.arg_debug = debug
         self.arg_quiet = quiet
         self.arg_verbosity = verbosity
+        self._managed_installed = set()
+        # bit mask of managed args to be removed from args, see store_args()
+        self._managed_mask = 0
 
         self.debug     = False
         self.verbosity = 0
@@ -202,6 +246,8 @@ class Main:
             #command = command_decorator.command_inst
 
         self.command = command
+        # custom exit function is set on first run, see __call__()
+        self._exit_installed = False
 
         self.compile = compile
         self.compiler_factory = compiler_factory
@@ -218,6 +264,7 @@ class Main:
             self.arg_quiet = quiet
         if verbosity is not None:
             self.arg_verbosity = verbosity
+        self._managed_installed = set()
         if compile is not None:
             self.compile = compile
         if compiler_factory is not None:
@@ -231,62 +278,67 @@ class Main:
             # other keyword arguments update command attribute
             self.command.update(**kwargs)
 
+    def _ensure_logging(self):
+        if not Main._logging_configured:
+            logging.basicConfig(format=self.log_format)
+            Main._logging_configured = True
+
+    def _default_error_handler(self, result):
+        '''error handler used, if error_handler is None: return error code'''
+        if isinstance(result, int):
+            return result
+        if result is False:
+            return self.error_code
+        return 0
+
+    def _set_level(self, level):
+        # setLevel() invalidates the level cache of all loggers, so only
+        # call it if level changes
+        if self._logger.level != level:
+            self._logger.setLevel(level)
+
     def init_managed_args(self):
-        logger = logging.getLogger()
-
-        _main = self
-        _main.verbosity = 0
-        if self.arg_debug:
-            @arg('--debug', help="print debug output", metavar='', nargs=0)
-            def debug_arg(self, parser, namespace, values, option_string=None):
-                _main.debug = True
-                logger.setLevel(logging.DEBUG)
-
-            try:
-                self.command.add_argument(debug_arg)
-            except argparse.ArgumentError:
-                pass
-
-        if self.arg_verbosity:
-            @arg('-v', '--verbosity', help="verbosity: set loglevel -v warning, -vv info, -vvv debug", nargs=0, metavar=0)
-            def verbosity_arg(self, parser, namespace, values, option_string=None):
-                _main.verbosity += 1
-                if _main.verbosity == 1:
-                    logger.setLevel(logging.WARNING)
-                if _main.verbosity == 2:
-                    logger.setLevel(logging.INFO)
-                if _main.verbosity == 3:
-                    logger.setLevel(logging.DEBUG)
-
-            try:
-                self.command.add_argument(verbosity_arg)
-            except argparse.ArgumentError:
-                pass
-
-        if self.arg_quiet:
-            @arg('--quiet', help="have no output", metavar='', nargs=0)
-            def quiet_arg(self, parser, namespace, values, option_string=None):
-                logger.setLevel(logging.CRITICAL)
-                _main.quiet = True
-
-            try:
-                self.command.add_argument(quiet_arg)
-            except argparse.ArgumentError:
-                pass
+        self.debug     = False
+        self.verbosity = 0
+        self.quiet     = False
+        self._managed_mask = ((1 if self.arg_debug else 0)
+            | (2 if self.arg_quiet else 0)
+            | (4 if self.arg_verbosity else 0))
+
+        if self.arg_debug or self.arg_verbosity or self.arg_quiet:
+            # default log level, managed args will change it
+            self._set_level(_VERBOSITY_LEVELS[0])
+
+        # managed argument actions look up main instance from parser
+        self.command.argparser._argdeco_main = self
+
+        for enabled, managed_arg in (
+                (self.arg_debug, debug_arg),
+                (self.arg_verbosity, verbosity_arg),
+                (self.arg_quiet, quiet_arg)):
+            if enabled and managed_arg not in self._managed_installed:
+                if not self.command.has_argument(managed_arg):
+                    self.command.add_argument(managed_arg)
+                self._managed_installed.add(managed_arg)
 
     def store_args(self, args):
-        if self.arg_debug:
-            del args.debug
-        if self.arg_quiet:
-            del args.quiet
-        if self.arg_verbosity:
-            del args.verbosity
+        mask = self._managed_mask
+        if mask:
+            if mask & 1:
+                del args.debug
+            if mask & 2:
+                del args.quiet
+            if mask & 4:
+                self.verbosity = args.verbosity
+                # --debug and --quiet take precedence over -v
+                if self.verbosity and not (self.debug or self.quiet):
+                    self._set_level(_VERBOSITY_LEVELS[min(self.verbosity, 3)])
+                del args.verbosity
 
         self.args = args
-        logger = logging.getLogger('argdeco.main')
-        logger.debug("args: %s", args)
+        log.debug("args: %s", args)
 
-        if not hasattr(args, 'action'):
+        if getattr(args, 'action', None) is None:
             if self.main_function:
                 args.action = self.main_function
             else:
@@ -305,23 +357,25 @@ class Main:
             def uninstall_bash_completion(dest):
                 main.uninstall_bash_completion(dest=dest)
         '''
-        if 'USERPROFILE' in os.environ and 'HOME' not in os.environ:
-            os.environ['HOME'] = os.environ['USERPROFILE']
+        _ensure_home()
         dest = expanduser(dest)
         if script_name is None:
             script_name = sys.argv[0]
-        lines = []
-        remove_line = 'register-python-argcomplete %s' % script_name
-        with open(dest, 'r') as f:
-            for line in f:
-                if line.strip().startswith('#'):
-                    lines.append(line)
-                    continue
-
-                if remove_line in line: continue
-                lines.append(line)
-        with open(dest, 'w') as f:
-            f.write(''.join(lines))
+        remove_line = _ARGCOMPLETE_PREFIX + script_name.encode()
+
+        with open(dest, 'rb') as f:
+            data = f.read()
+
+        # leave dest untouched, if there is nothing to remove
+        if remove_line not in data:
+            return
+
+        # rewrite dest in place, which keeps owner, mode and links of it
+        with open(dest, 'r+b') as f:
+            for line in io.BytesIO(data):
+                if remove_line not in line or _COMMENT_RE.match(line):
+                    f.write(line)
+            f.truncate()
 
     def install_bash_completion(self, script_name=None, dest="~/.bashrc"):
         '''add line to activate bash_completion for given script_name into dest
@@ -337,15 +391,24 @@ class Main:
                 main.install_bash_completion(dest=dest)
 
         '''
-        if 'USERPROFILE' in os.environ and 'HOME' not in os.environ:
-            os.environ['HOME'] = os.environ['USERPROFILE']
+        _ensure_home()
         dest = expanduser(dest)
         if script_name is None:
             script_name = sys.argv[0]
 
+        install_line = 'eval "$(register-python-argcomplete %s)"\n' % script_name
+
+        # nothing to do, if install_line is the only registration of script_name
+        with open(dest, 'rb') as f:
+            data = f.read()
+        marker = install_line.encode()
+        if data.count(_ARGCOMPLETE_PREFIX + script_name.encode()) == 1 and \
+                (data.startswith(marker) or b'\n' + marker in data):
+            return
+
         self.uninstall_bash_completion(script_name=script_name, dest=dest)
         with open(dest, 'a') as f:
-            f.write('eval "$(register-python-argcomplete %s)"\n' % script_name)
+            f.write(install_line)
 
     def add_arguments(self, *args):
         """Explicitely add arguments::
@@ -441,44 +504,26 @@ class Main:
                 value of the invoked action function
         """
 
+        cmd = self.command
+
         error_handler    = kwargs.pop('error_handler', self.error_handler)
         compile          = kwargs.pop('compile', self.compile)
         compiler_factory = kwargs.pop('compiler_factory', self.compiler_factory)
 
-        def default_error_handler(result):
-            if isinstance(result, int):
-                return result
-            if result is False:
-                return self.error_code
-            return 0
-
         if error_handler is None:
-            error_handler = default_error_handler
-
-        if hasattr(self, 'arg_debug') and 'debug' in kwargs:
-            setattr(self, 'arg_debug', kwargs.pop('debug'))
+            error_handler = self._default_error_handler
 
-        if hasattr(self, 'arg_verbosity') and 'verbosity' in kwargs:
-            setattr(self, 'arg_verbosity', kwargs.pop('verbosity'))
-
-        if hasattr(self, 'arg_quiet') and 'quiet' in kwargs:
-            setattr(self, 'arg_quiet', kwargs.pop('quiet'))
+        if kwargs:
+            for k in self._MANAGED_ARGS.intersection(kwargs):
+                setattr(self, 'arg_'+k, kwargs.pop(k))
 
-        argv=None
-        if 'argv' in kwargs:
-            argv = kwargs.pop('argv')
+        argv = kwargs.pop('argv', None)
 
         # other keyword arguments update command attribute
-        self.command.update(**kwargs)
-
-        # set a custom exit function
-        def _exit(result=0, message=None):
-            raise ArgParseExit(result, message)
-            #return error_handler(result)
-        self.command.update(exit=_exit)
+        cmd.update(**kwargs)
 
         # handle case if called as decorator
-        if len(args) == 1 and isfunction(args[0]):
+        if len(args) == 1 and type(args[0]) is FunctionType:
             self.main_function = args[0]
             return args[0]
 
@@ -486,7 +531,7 @@ class Main:
         # argv list, if any
         for a in args:
             if isinstance(a, arg):
-                self.command.add_argument(a)
+                cmd.add_argument(a)
             else:
                 if argv is None:
                     argv = []
@@ -497,32 +542,33 @@ class Main:
         # this object, that there may be defined a function in a subsequent
         # call (this is the case if @main(args...) is used).
 
-        if argv is not None and self.main_function is None and not self.command.has_action():
+        if argv is not None and self.main_function is None and not cmd.has_action():
             raise ValueError("Main cannot handle any arguments, when main_function is not yet defined")
 
         # at this point we are still in decorating mode
-        if argv is None and self.main_function is None and not self.command.has_action():
+        if argv is None and self.main_function is None and not cmd.has_action():
             return self
 
         self.exception = None
 
         # right before doing the command execution add the managed args
-        self.init_managed_args()
+        self._ensure_logging()
+        if not self._exit_installed:
+            # set a custom exit function
+            cmd.update(exit=_exit)
+            self._exit_installed = True
         try:
-            return error_handler(self.command.execute(argv, compile=compile, preprocessor=self.store_args, compiler_factory=compiler_factory))
+            if self.arg_debug or self.arg_verbosity or self.arg_quiet:
+                self.init_managed_args()
+            return error_handler(cmd.execute(argv, compile=compile, preprocessor=self.store_args, compiler_factory=compiler_factory))
 
         except self.catch_exceptions as e:
-            logger = logging.getLogger()
-            logger.debug("caught exception (self.debug: %s)", self.debug, exc_info=1)
+            self._logger.debug("caught exception (self.debug: %s)", self.debug, exc_info=1)
 
             if self.verbosity or self.print_traceback:
-                import traceback
                 traceback.print_exc()
             elif not self.quiet:
-                if PY3:
-                    sys.stderr.write("%s\n" % e)
-                else:
-                    sys.stderr.write((u"%s\n" % e).encode('utf-8'))
+                sys.stderr.write("%s\n" % e)
 
             self.exception = e
             if hasattr(e, 'error_code'):
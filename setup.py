@@ -13,6 +13,7 @@ setup(name='argdeco',
   author_email = "tabkiwi@gmail.com",
   url = 'https://github.com/klorenz/python-argdeco',
   description = "specify command arguments in function decorator",
+  python_requires = '>=3.5',
   install_requires=[
     'argcomplete'
   ],
@@ -11,4 +11,84 @@ def test_config_arg():
 
     assert command.get_config_name(cmd_foo, 'first') == "foo.first"
 
-    command.execute(['foo', '--first', '1'])
\ No newline at end of file
+    command.execute(['foo', '--first', '1'])
+
+def test_has_argument():
+    from argdeco import CommandDecorator, arg
+
+    command = CommandDecorator()
+    foo = arg('--foo', '-f')
+
+    assert not command.has_argument(foo)
+    command.add_argument(foo)
+    assert command.has_argument(foo)
+    assert command.has_argument(arg('-f'))
+
+    assert not command.has_argument(arg('name'))
+    command.add_argument(arg('name'))
+    assert command.has_argument(arg('name'))
+
+
+def test_lazy_subcommand_arguments():
+    from argdeco import CommandDecorator, arg
+
+    command = CommandDecorator()
+    result = {}
+
+    @command('foo', arg('--first'))
+    def cmd_foo(first):
+        result['foo'] = first
+
+    @command('bar', arg('--second'))
+    def cmd_bar(second):
+        result['bar'] = second
+
+    command.execute(['foo', '--first', '1'])
+    assert result == {'foo': '1'}
+
+    # arguments of commands not invoked are not yet added
+    assert command['bar']._pending_arguments
+    assert not command['foo']._pending_arguments
+
+def test_lazy_subcommand_parser_api():
+    import argparse
+    import pytest
+    from argdeco import CommandDecorator, arg
+
+    command = CommandDecorator()
+    result = {}
+
+    @command('foo', arg('--first'))
+    def cmd_foo(first, second):
+        result['foo'] = (first, second)
+
+    # add_argument() returns the action, e.g. for argcomplete completers
+    action = command['foo'].add_argument('--second')
+    assert action.dest == 'second'
+    action.completer = None
+
+    command.execute(['foo', '--first', '1', '--second', '2'])
+    assert result == {'foo': ('1', '2')}
+
+    @command('bar', arg('--q', default='argdefault'))
+    def cmd_bar(q):
+        result['bar'] = q
+
+    # set_defaults() overrides defaults of recorded arguments
+    command['bar'].set_defaults(q='override')
+    assert command['bar'].get_default('q') == 'override'
+    command.execute(['bar'])
+    assert result['bar'] == 'override'
+
+    # invalid arguments are reported on definition
+    with pytest.raises(argparse.ArgumentError):
+        @command('dup', arg('--z'), arg('--z'))
+        def cmd_dup(z):
+            pass
+
+    for i, invalid in enumerate((arg('--x', nargs=0), arg('--x', bogus=1),
+                    arg('--x', action='store_true', type=int),
+                    arg('x', required=True),
+                    arg('--x', nargs=2, metavar=('A', 'B', 'C')))):
+        with pytest.raises((ValueError, TypeError)):
+            command('invalid%d' % i, invalid)(lambda x: None)
@@ -42,4 +42,106 @@ def test_config_class():
 
     assert x.get('a.b') is None
 
+def test_config_update_keeps_sections():
+    from argdeco import ConfigDict
+
+    # an empty section (e.g. "foo:" in YAML) does not replace existing one,
+    # whether or not other keys need merging
+    x = ConfigDict({'foo': {'bar': 1}})
+    assert x.update({'foo': None}) == {'foo': {'bar': 1}}
+    assert x.update({'foo': None, 'x': {'y': 1}}) == {'foo': {'bar': 1}, 'x': {'y': 1}}
+
 #def test_config_factory():
+
+def test_config_factory_yaml(tmpdir):
+    from argdeco import CommandDecorator, arg
+    from argdeco.config import config_factory
+
+    f = tmpdir.join("config.yaml")
+    f.write("foo:\n  bar: glork\nx: 1\n")
+
+    factory = config_factory(config_file=arg('--config-file', '-C'))
+    command = CommandDecorator(compiler_factory=factory)
+
+    # config_file argument is registered on factory initialization
+    factory(command)
+
+    result = {}
+
+    @command('foo', arg('--first'))
+    def cmd_foo(config):
+        result.update(config)
+
+    command.execute(['-C', f.strpath, 'foo', '--first', '1'])
+    assert result['foo'] == {'bar': 'glork'}
+    assert result['x'] == 1
+    assert result['foo.first'] == '1'
+
+def test_load_yaml_file_cache(tmpdir):
+    import json, os
+    from argdeco.config import load_yaml_file
+
+    f = tmpdir.join("config.yaml")
+    f.write("foo:\n  bar: glork\n")
+    cache = tmpdir.join("config.yaml.cache.json")
+
+    assert load_yaml_file(f.strpath) == {'foo': {'bar': 'glork'}}
+    assert cache.check()
+
+    # cache is used as long as it matches file
+    cached = json.loads(cache.read())
+    cached['data'] = {'from': 'cache'}
+    cache.write(json.dumps(cached))
+    assert load_yaml_file(f.strpath) == {'from': 'cache'}
+
+    # cache is invalidated on change, even if file gets an older mtime
+    mtime = f.mtime()
+    f.write("foo:\n  bar: blub\n")
+    os.utime(f.strpath, (mtime - 100, mtime - 100))
+    assert load_yaml_file(f.strpath) == {'foo': {'bar': 'blub'}}
+    assert load_yaml_file(f.strpath) == {'foo': {'bar': 'blub'}}
+
+    # cache gets permissions of file
+    f = tmpdir.join("secret.yaml")
+    f.write("password: secret\n")
+    f.chmod(0o600)
+    load_yaml_file(f.strpath)
+    assert tmpdir.join("secret.yaml.cache.json").stat().mode & 0o777 == 0o600
+    assert not [p for p in tmpdir.listdir() if p.ext == '.tmp']
+
+    # data, which cannot be represented in JSON, is not cached
+    f = tmpdir.join("dates.yaml")
+    f.write("date: 2018-01-01\n")
+    load_yaml_file(f.strpath)
+    assert not tmpdir.join("dates.yaml.cache.json").check()
+
+def test_config_flatten():
+    from argdeco import ConfigDict
+
+    assert ConfigDict().flatten({'a': 1, 'b': {'c': {'d': 2}, 'e': 3}, 'f': 4}) == {
+        'a': 1, 'b.c.d': 2, 'b.e': 3, 'f': 4
+    }
+
+def test_config_factory_load_stdin(monkeypatch):
+    import io
+    from argdeco import CommandDecorator, arg
+    from argdeco.config import config_factory
+
+    class Config(dict):
+        def load(self, stream):
+            self['loaded'] = stream.read()
+
+    monkeypatch.setattr('sys.stdin', io.StringIO('from stdin'))
+
+    factory = config_factory(Config, config_file=arg('--config-file', '-C'))
+    command = CommandDecorator(compiler_factory=factory)
+    factory(command)
+
+    result = {}
+
+    @command('foo')
+    def cmd_foo(config):
+        result.update(config)
+
+    command.execute(['-C', '-', 'foo'])
+    assert result['loaded'] == 'from stdin'
@@ -99,6 +99,26 @@ def test_main_verbosity(caplog):
     ]
     caplog.clear()
 
+def test_main_verbosity_debug_quiet():
+    main = Main(error_handler=None, verbosity=True, debug=True, quiet=True)
+
+    @main
+    def _main():
+        pass
+
+    # --debug and --quiet are not overridden by -v
+    main('-v', '--debug')
+    assert logging.getLogger().level == logging.DEBUG
+    assert main.debug
+
+    main('-v', '--quiet')
+    assert logging.getLogger().level == logging.CRITICAL
+    assert main.quiet and not main.debug
+
+    main('-vv')
+    assert logging.getLogger().level == logging.INFO
+    assert not main.quiet
+
 def test_main_install_bash_completion(tmpdir):
     f = tmpdir.join("foo.sh")
     f.write("# test\n")
@@ -108,11 +128,33 @@ def test_main_install_bash_completion(tmpdir):
         # test
         eval "$(register-python-argcomplete myscript)"
     """)
+    # installing twice does not add another line
+    main.install_bash_completion('myscript', dest=f.strpath)
+    assert f.read().count('register-python-argcomplete myscript') == 1
     main.uninstall_bash_completion('myscript', dest=f.strpath)
     assert f.read() == dedent("""\
         # test
     """)
 
+def test_main_uninstall_bash_completion_in_place(tmpdir):
+    import os, stat
+    f = tmpdir.join("rc")
+    f.write('# test\neval "$(register-python-argcomplete myscript)"\n')
+    f.chmod(0o640)
+    link = tmpdir.join("link")
+    link.mksymlinkto(f)
+    hardlink = tmpdir.join("hardlink")
+    os.link(f.strpath, hardlink.strpath)
+    inode = os.stat(f.strpath).st_ino
+
+    Main().uninstall_bash_completion('myscript', dest=link.strpath)
+
+    # symlink, mode and hard links of rc file are kept
+    assert link.islink()
+    assert f.read() == hardlink.read() == "# test\n"
+    assert os.stat(f.strpath).st_ino == inode
+    assert stat.S_IMODE(os.stat(f.strpath).st_mode) == 0o640
+
 def test_main_empty_subcommand(capsys):
 
     main = Main(error_handler=None, compile=True)
@@ -135,3 +177,22 @@ def test_main_empty_subcommand(capsys):
 
     # TODO: improve test
 
+
+def test_main_exit_installed_on_run():
+    import pytest
+    from argdeco.main import ArgParseExit
+
+    main = Main(error_handler=None)
+
+    @main.command('foo')
+    def _foo():
+        pass
+
+    # constructing Main does not change exit behaviour of its parser
+    with pytest.raises(SystemExit):
+        main.command.execute(['-h'])
+
+    # running main does
+    assert main('--bad') == 2
+    with pytest.raises(ArgParseExit):
+        main.command.execute(['-h'])